@@ -0,0 +1,283 @@
+"""
+Spatially indexed area-of-interest hit testing for the Eye Tribe eye tracker (http://theeyetribe.com)
+
+Areas of interest (rectangles, circles and polygons in screen pixels) are indexed in a uniform grid,
+so hit testing live gaze only checks the few areas near the gaze point.
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import threading
+import numpy as np
+from peyetribe import EyeTribe
+
+
+class AOI():
+
+    """
+    Base class for an area of interest in screen pixel coordinates.
+
+    Subclasses implement contains() for single points and contains_all() for NumPy arrays of points,
+    and set bbox to the (left, top, right, bottom) bounding box used for the spatial index.
+    """
+
+    def __init__(self, name, bbox):
+        self.name = name
+        self.bbox = bbox
+
+    def contains(self, x, y):
+        raise NotImplementedError
+
+    def contains_all(self, xs, ys):
+        raise NotImplementedError
+
+
+class Rect(AOI):
+
+    """A rectangular area of interest given by its top-left corner, width and height."""
+
+    def __init__(self, name, left, top, width, height):
+        AOI.__init__(self, name, (left, top, left + width, top + height))
+
+    def contains(self, x, y):
+        return self.bbox[0] <= x < self.bbox[2] and self.bbox[1] <= y < self.bbox[3]
+
+    def contains_all(self, xs, ys):
+        return (xs >= self.bbox[0]) & (xs < self.bbox[2]) & (ys >= self.bbox[1]) & (ys < self.bbox[3])
+
+
+class Circle(AOI):
+
+    """A circular area of interest given by its center and radius."""
+
+    def __init__(self, name, cx, cy, radius):
+        AOI.__init__(self, name, (cx - radius, cy - radius, cx + radius, cy + radius))
+        self._cx = cx
+        self._cy = cy
+        self._r2 = radius * radius
+
+    def contains(self, x, y):
+        return (x - self._cx) ** 2 + (y - self._cy) ** 2 <= self._r2
+
+    def contains_all(self, xs, ys):
+        return (xs - self._cx) ** 2 + (ys - self._cy) ** 2 <= self._r2
+
+
+class Polygon(AOI):
+
+    """A polygonal area of interest given by a list of (x, y) vertices; tested with the even-odd rule."""
+
+    def __init__(self, name, vertices):
+        vertices = list(vertices)
+        self._vx = np.array([v[0] for v in vertices], dtype=float)
+        self._vy = np.array([v[1] for v in vertices], dtype=float)
+        AOI.__init__(self, name, (self._vx.min(), self._vy.min(), self._vx.max(), self._vy.max()))
+        self._edges = list(zip(vertices, vertices[-1:] + vertices[:-1]))
+
+    def contains(self, x, y):
+        inside = False
+        for (x1, y1), (x2, y2) in self._edges:
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / float(y2 - y1) + x1:
+                inside = not inside
+        return inside
+
+    def contains_all(self, xs, ys):
+        x1, y1 = self._vx[:, None], self._vy[:, None]
+        x2, y2 = np.roll(self._vx, 1)[:, None], np.roll(self._vy, 1)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cross = ((y1 > ys) != (y2 > ys)) & (xs < (x2 - x1) * (ys - y1) / (y2 - y1) + x1)
+        return (cross.sum(axis=0) % 2) == 1
+
+
+class AOIRegistry(EyeTribe.ScreenConsumer):
+
+    """
+    A set of areas of interest with a uniform grid index over the screen for fast hit testing.
+
+    Each grid cell of cellsize x cellsize pixels lists the AOIs whose bounding box overlaps it,
+    so a hit test only checks the few AOIs near the gaze point. AOIs may overlap.
+
+    As a consumer of the push stream, it keeps running entry, exit and dwell statistics per AOI.
+    The on_enter and on_exit callbacks, if given, are called with the AOI and the frame.
+    """
+
+    class Stats():
+        def __init__(self):
+            self.entries = 0
+            self.exits = 0
+            self.dwell = 0.0
+            self.inside = False
+
+    def __init__(self, width, height, cellsize=64, attr='avg', maxgap=0.1, on_enter=None, on_exit=None):
+        self._width = width
+        self._height = height
+        self._cellsize = cellsize
+        self._attr = attr
+        self._maxgap = maxgap
+        self._on_enter = on_enter
+        self._on_exit = on_exit
+
+        self._nx = int(np.ceil(width / float(cellsize)))
+        self._ny = int(np.ceil(height / float(cellsize)))
+        self._aois = []
+        self._indexed = None  # (AOI list, grid) snapshot, rebuilt after changes
+        self._lock = threading.Lock()
+
+        self._stats = {}
+        self._current = []
+        self._lasttime = None
+
+    def __len__(self):
+        return len(self._aois)
+
+    def add(self, aoi):
+        """Register an AOI (a Rect, Circle or Polygon) and return it."""
+        with self._lock:
+            # replace rather than modify the list, as the listener thread may be hit testing a snapshot of it
+            self._aois = self._aois + [aoi]
+            self._stats[aoi.name] = AOIRegistry.Stats()
+            self._indexed = None
+        return aoi
+
+    def remove(self, name):
+        """Unregister the AOI(s) with the given name."""
+        with self._lock:
+            self._aois = [a for a in self._aois if a.name != name]
+            self._current = [a for a in self._current if a.name != name]
+            self._stats.pop(name, None)
+            self._indexed = None
+
+    def _cells(self, bbox):
+        c = self._cellsize
+        x0 = max(int(bbox[0] // c), 0)
+        y0 = max(int(bbox[1] // c), 0)
+        x1 = min(int(bbox[2] // c), self._nx - 1)
+        y1 = min(int(bbox[3] // c), self._ny - 1)
+        return [(cy, cx) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def _index(self):
+        """
+        Return the AOI list and the grid index into it, (re)building them if AOIs were changed since last time.
+
+        The two are built and returned together, so the grid indices always refer to the list returned.
+        """
+        indexed = self._indexed
+        if indexed is None:
+            with self._lock:
+                aois = self._aois
+                grid = [[[] for cx in range(self._nx)] for cy in range(self._ny)]
+                for i, aoi in enumerate(aois):
+                    for cy, cx in self._cells(aoi.bbox):
+                        grid[cy][cx].append(i)
+                indexed = self._indexed = (aois, grid)
+        return indexed
+
+    def hit(self, x, y):
+        """Return the list of AOIs containing the screen point (x, y)."""
+        # points off the screen are looked up in the nearest edge cell, which also lists AOIs extending past it
+        cx = min(max(int(x // self._cellsize), 0), self._nx - 1)
+        cy = min(max(int(y // self._cellsize), 0), self._ny - 1)
+        aois, grid = self._index()
+        return [aois[i] for i in grid[cy][cx] if aois[i].contains(x, y)]
+
+    def hit_all(self, xs, ys):
+        """
+        Hit test arrays of screen points in one go.
+
+        Returns a boolean array of shape (len(xs), len(self)) where element [n, i] tells whether
+        point n falls within the i'th registered AOI.
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        aois, grid = self._index()
+        hits = np.zeros((len(xs), len(aois)), dtype=bool)
+
+        cx = np.clip(np.floor(xs / self._cellsize).astype(int), 0, self._nx - 1)
+        cy = np.clip(np.floor(ys / self._cellsize).astype(int), 0, self._ny - 1)
+        cell = cy * self._nx + cx
+
+        # group the points by cell so each candidate AOI is tested once per cell
+        for c in np.unique(cell):
+            pts = np.nonzero(cell == c)[0]
+            for i in grid[c // self._nx][c % self._nx]:
+                hits[pts, i] = aois[i].contains_all(xs[pts], ys[pts])
+
+        return hits
+
+    def update(self, frame):
+        """
+        Update the running entry, exit and dwell statistics with a new frame.
+
+        Dwell time is counted in tracker time, with gaps capped at maxgap seconds. Frames without
+        on-screen gaze (e.g. blinks) do not change which AOIs the gaze is considered to be in.
+        """
+        # an AOI may be removed meanwhile, in which case its statistics are gone too
+        stats = self._stats
+        if self._lasttime is not None and frame.time > self._lasttime:
+            dt = min(frame.time - self._lasttime, self._maxgap)
+            for aoi in self._current:
+                st = stats.get(aoi.name)
+                if st is not None:
+                    st.dwell += dt
+        self._lasttime = frame.time
+
+        if not frame.hasgaze:
+            return
+
+        c = getattr(frame, self._attr)
+        current = self.hit(c.x, c.y)
+
+        for aoi in self._current:
+            st = stats.get(aoi.name)
+            if aoi not in current and st is not None:
+                st.exits += 1
+                st.inside = False
+                if self._on_exit is not None:
+                    self._on_exit(aoi, frame)
+        for aoi in current:
+            st = stats.get(aoi.name)
+            if aoi not in self._current and st is not None:
+                st.entries += 1
+                st.inside = True
+                if self._on_enter is not None:
+                    self._on_enter(aoi, frame)
+
+        self._current = current
+
+    def current(self):
+        """The list of AOIs the gaze was in at the latest frame."""
+        return list(self._current)
+
+    def stats(self, name):
+        """The running statistics (entries, exits, dwell in seconds and inside flag) for an AOI."""
+        return self._stats[name]
+
+    def reset_stats(self):
+        """Clear the running statistics, e.g. at the start of a new trial."""
+        self._stats = dict((aoi.name, AOIRegistry.Stats()) for aoi in self._aois)
+        self._current = []
+        self._lasttime = None
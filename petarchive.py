@@ -0,0 +1,269 @@
+"""
+Compressed, chunked archive format for Eye Tribe eye tracker (http://theeyetribe.com) gaze data
+
+Frames are stored column by column in chunks, delta and zigzag encoded and zlib compressed, with the
+timestamp range of each chunk in its header so readers only decompress the chunks they need.
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import struct
+import json
+import zlib
+import threading
+import numpy as np
+from peyetribe import EyeTribe
+
+
+# column name, scale to integer, and how to get it from a frame
+COLUMNS = (
+    ('etime', 1e6, lambda f: f.etime),
+    ('time', 1e3, lambda f: f.time),
+    ('timestamp', 1e3, lambda f: f.timestamp),
+    ('fix', 1, lambda f: f.fix),
+    ('state', 1, lambda f: f.state),
+    ('rawx', 1e2, lambda f: f.raw.x),
+    ('rawy', 1e2, lambda f: f.raw.y),
+    ('x', 1e2, lambda f: f.avg.x),
+    ('y', 1e2, lambda f: f.avg.y),
+    ('lrawx', 1e2, lambda f: f.lefteye.raw.x),
+    ('lrawy', 1e2, lambda f: f.lefteye.raw.y),
+    ('lx', 1e2, lambda f: f.lefteye.avg.x),
+    ('ly', 1e2, lambda f: f.lefteye.avg.y),
+    ('lpsize', 1e3, lambda f: f.lefteye.psize),
+    ('lpcx', 1e5, lambda f: f.lefteye.pcenter.x),
+    ('lpcy', 1e5, lambda f: f.lefteye.pcenter.y),
+    ('rrawx', 1e2, lambda f: f.righteye.raw.x),
+    ('rrawy', 1e2, lambda f: f.righteye.raw.y),
+    ('rx', 1e2, lambda f: f.righteye.avg.x),
+    ('ry', 1e2, lambda f: f.righteye.avg.y),
+    ('rpsize', 1e3, lambda f: f.righteye.psize),
+    ('rpcx', 1e5, lambda f: f.righteye.pcenter.x),
+    ('rpcy', 1e5, lambda f: f.righteye.pcenter.y),
+)
+
+_magic = b"PETA"
+_chunk_magic = b"PETC"
+_version = 1
+_chunk_header = struct.Struct("<4sIddI")  # magic, rows, first and last timestamp, compressed length
+_column_header = struct.Struct("<Bq")     # delta width (bytes), first value
+_widths = {1: np.uint8, 2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+
+def _encode_column(values):
+    """Delta and zigzag encode an int64 column, packed in the smallest unsigned width that holds it."""
+    d = np.diff(values)
+    z = ((d << 1) ^ (d >> 63)).view(np.uint64)
+    m = int(z.max()) if len(z) else 0
+    width = 1 if m < 1 << 8 else 2 if m < 1 << 16 else 4 if m < 1 << 32 else 8
+    return _column_header.pack(width, int(values[0])) + z.astype(_widths[width]).tobytes()
+
+
+def _decode_column(buf, pos, rows):
+    """Decode a column encoded by _encode_column from buf at pos; returns (int64 values, new pos)."""
+    width, first = _column_header.unpack_from(buf, pos)
+    pos += _column_header.size
+    z = np.frombuffer(buf, dtype=_widths[width], count=rows - 1, offset=pos).astype(np.uint64)
+    pos += width * (rows - 1)
+    d = (z >> np.uint64(1)).view(np.int64) ^ -(z & np.uint64(1)).view(np.int64)
+    values = np.empty(rows, dtype=np.int64)
+    values[0] = first
+    np.cumsum(d, out=values[1:])
+    values[1:] += first
+    return values, pos
+
+
+class ArchiveWriter(EyeTribe.Consumer):
+
+    """
+    Writes frames to a compact, chunked archive file.
+
+    Frames are collected in chunks of chunksize rows; each chunk is stored column by column with
+    delta and zigzag encoding, and compressed with zlib at the given (fast) level. Each chunk
+    header holds its row count and timestamp range, so readers can skip chunks they do not need.
+
+    Values are stored as integers after scaling (see COLUMNS), e.g. gaze coordinates to 0.01 pixel
+    and times to the microsecond (etime) or millisecond (time, timestamp).
+
+    As a consumer of the push stream, it can archive the stream live. Call close() when done;
+    frames arriving after that are ignored.
+    """
+
+    def __init__(self, path, chunksize=4096, level=1):
+        self._file = open(path, 'wb')
+        self._chunksize = chunksize
+        self._level = level
+        self._rows = []
+        self._closed = False
+        self._lock = threading.Lock()       # guards _rows and _closed
+        self._writelock = threading.Lock()  # serializes writing chunks to the file
+
+        meta = json.dumps({'columns': [c[0] for c in COLUMNS], 'scales': [c[1] for c in COLUMNS]}).encode()
+        self._file.write(_magic + struct.pack("<BI", _version, len(meta)) + meta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def update(self, frame):
+        """Add a frame to the archive; frames written after close() are ignored."""
+        row = tuple(get(frame) for name, scale, get in COLUMNS)
+        with self._lock:
+            if self._closed:
+                return
+            self._rows.append(row)
+            full = len(self._rows) >= self._chunksize
+        if full:
+            self.flush()
+
+    def _write_chunk(self, rows):
+        """Encode and write rows as a chunk; the caller must hold _writelock."""
+        if not rows:
+            return
+
+        a = np.array(rows, dtype=float)
+        payload = b"".join(_encode_column(np.round(a[:, i] * COLUMNS[i][1]).astype(np.int64))
+                           for i in range(len(COLUMNS)))
+        data = zlib.compress(payload, self._level)
+        ts = a[:, 2]
+
+        self._file.write(_chunk_header.pack(_chunk_magic, len(rows), ts.min(), ts.max(), len(data)))
+        self._file.write(data)
+
+    def flush(self):
+        """Encode and write the frames collected so far as a chunk."""
+        # _writelock keeps the chunks in order if flushed from both the listener and another thread
+        with self._writelock:
+            with self._lock:
+                if self._closed:
+                    return
+                rows, self._rows = self._rows, []
+            self._write_chunk(rows)
+
+    def close(self):
+        """Write any remaining frames and close the file."""
+        with self._writelock:
+            with self._lock:
+                if self._closed:
+                    return
+                self._closed = True
+                rows, self._rows = self._rows, []
+            self._write_chunk(rows)
+            self._file.close()
+
+
+class ArchiveReader():
+
+    """
+    Reads an archive written by ArchiveWriter.
+
+    Only the chunk headers are read when opening; read() then decompresses just the chunks
+    overlapping the requested timestamp range.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        if self._file.read(len(_magic)) != _magic:
+            raise Exception("Not a peyetribe archive: %s" % path)
+        version, n = struct.unpack("<BI", self._file.read(5))
+        if version != _version:
+            raise Exception("Unsupported peyetribe archive version %d" % version)
+        meta = json.loads(self._file.read(n).decode())
+        self._columns = meta['columns']
+        self._scales = meta['scales']
+
+        # index of (file offset, rows, first timestamp, last timestamp, compressed length) per chunk
+        self._chunks = []
+        while True:
+            h = self._file.read(_chunk_header.size)
+            if len(h) < _chunk_header.size:
+                break
+            magic, rows, tmin, tmax, length = _chunk_header.unpack(h)
+            if magic != _chunk_magic:
+                raise Exception("Corrupt peyetribe archive chunk at offset %d" % (self._file.tell() - len(h)))
+            self._chunks.append((self._file.tell(), rows, tmin, tmax, length))
+            self._file.seek(length, 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def columns(self):
+        """The names of the columns in the archive."""
+        return list(self._columns)
+
+    def __len__(self):
+        return sum(c[1] for c in self._chunks)
+
+    def time_range(self):
+        """The (first, last) timestamp in the archive, or None if it is empty."""
+        if not self._chunks:
+            return None
+        return (min(c[2] for c in self._chunks), max(c[3] for c in self._chunks))
+
+    def read(self, tmin=None, tmax=None, columns=None):
+        """
+        Return a dict of NumPy arrays with the frames with timestamps within tmin..tmax (both optional).
+
+        columns can limit the columns returned; 'timestamp' is always decoded for the range check.
+        """
+        columns = self._columns if columns is None else columns
+        parts = dict((c, []) for c in columns)
+
+        for offset, rows, cmin, cmax, length in self._chunks:
+            if (tmin is not None and cmax < tmin) or (tmax is not None and cmin > tmax):
+                continue
+            self._file.seek(offset)
+            buf = zlib.decompress(self._file.read(length))
+
+            pos = 0
+            decoded = {}
+            for name, scale in zip(self._columns, self._scales):
+                values, pos = _decode_column(buf, pos, rows)
+                if name in parts or name == 'timestamp':
+                    decoded[name] = values / float(scale) if scale != 1 else values
+
+            keep = np.ones(rows, dtype=bool)
+            if tmin is not None:
+                keep &= decoded['timestamp'] >= tmin
+            if tmax is not None:
+                keep &= decoded['timestamp'] <= tmax
+            for c in columns:
+                parts[c].append(decoded[c][keep])
+
+        d = dict((c, np.concatenate(parts[c]) if parts[c] else np.zeros(0)) for c in columns)
+        if 'fix' in d:
+            d['fix'] = d['fix'].astype(bool)
+        return d
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,123 @@
+"""
+Epoching of Eye Tribe eye tracker (http://theeyetribe.com) gaze data around external markers
+
+Markers recorded with tracker.mark(label) share the wall-time base of Frame.etime and Frame.timestamp;
+the functions here use sorted indexes and binary search to cut gaze data into per-event windows.
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import numpy as np
+
+
+def frames_to_arrays(frames, clock='timestamp'):
+    """
+    Convert a sequence of frames (e.g. recorded from next()) to a dict of NumPy column arrays.
+
+    The 't' column holds the frame clock given ('timestamp', 'etime' or 'time'); the others are
+    'state', 'fix', 'x', 'y' (averaged gaze), 'rawx', 'rawy' and per-eye 'lx', 'ly', 'lpsize',
+    'rx', 'ry', 'rpsize'.
+    """
+    cols = ('t', 'state', 'fix', 'x', 'y', 'rawx', 'rawy', 'lx', 'ly', 'lpsize', 'rx', 'ry', 'rpsize')
+    rows = [(getattr(f, clock), f.state, f.fix, f.avg.x, f.avg.y, f.raw.x, f.raw.y,
+             f.lefteye.avg.x, f.lefteye.avg.y, f.lefteye.psize,
+             f.righteye.avg.x, f.righteye.avg.y, f.righteye.psize) for f in frames]
+    a = np.array(rows, dtype=float).reshape(-1, len(cols))
+
+    d = dict((c, a[:, i]) for i, c in enumerate(cols))
+    d['state'] = d['state'].astype(int)
+    d['fix'] = d['fix'].astype(bool)
+    return d
+
+
+def marker_times(markers, label=None):
+    """Return the sorted times of the markers (from tracker.markers()), optionally only those with label."""
+    return np.sort(np.array([m.etime for m in markers if label is None or m.label == label], dtype=float))
+
+
+def epoch_bounds(t, onsets, tmin=-0.2, tmax=1.0):
+    """
+    Return the (start, stop) index arrays into the sorted times t of the samples within tmin..tmax
+    seconds around each onset, found with binary search.
+    """
+    onsets = np.asarray(onsets, dtype=float)
+    return np.searchsorted(t, onsets + tmin, 'left'), np.searchsorted(t, onsets + tmax, 'right')
+
+
+def epochs(t, data, onsets, tmin=-0.2, tmax=1.0):
+    """
+    Cut the samples of one or more columns into windows of tmin..tmax seconds around each onset.
+
+    t is the array of sample times and data is either a single array or a dict of arrays (as
+    from frames_to_arrays) of the same length; unsorted input is sorted first. Returns (times, data)
+    where times is an (onsets x samples) array of times relative to each onset and data has the same
+    shape (or is a dict of such arrays). Epochs with fewer samples than the longest are padded with NaN.
+    """
+    t = np.asarray(t, dtype=float)
+    order = None
+    if len(t) > 1 and np.any(np.diff(t) < 0):
+        order = np.argsort(t, kind='mergesort')
+        t = t[order]
+
+    lo, hi = epoch_bounds(t, onsets, tmin, tmax)
+    n = int((hi - lo).max()) if len(lo) else 0
+    idx = lo[:, None] + np.arange(n)[None, :]
+    valid = idx < hi[:, None]
+    idx = np.where(valid, idx, 0)
+
+    def take(a):
+        if len(a) == 0:
+            return np.full(idx.shape, np.nan)
+        return np.where(valid, a[idx], np.nan)
+
+    def cut(a):
+        a = np.asarray(a, dtype=float)
+        return take(a if order is None else a[order])
+
+    # t is already sorted, so it must not go through cut()
+    times = take(t) - np.asarray(onsets, dtype=float)[:, None]
+    if isinstance(data, dict):
+        return times, dict((k, cut(v)) for k, v in data.items())
+    return times, cut(data)
+
+
+if __name__ == "__main__":
+    """
+    Check epoching of sorted and unsorted input -- this code is only executed if file is run directly.
+    """
+
+    times, data = epochs([0, 1, 2, 3], [10, 11, 12, 13], [1.5], tmin=-2, tmax=2)
+    assert np.allclose(times, [[-1.5, -0.5, 0.5, 1.5]]) and np.allclose(data, [[10, 11, 12, 13]])
+
+    times, data = epochs([3, 1, 2, 0], {'x': [13, 11, 12, 10]}, [1.5], tmin=-2, tmax=2)
+    assert np.allclose(times, [[-1.5, -0.5, 0.5, 1.5]]), times
+    assert np.allclose(data['x'], [[10, 11, 12, 13]]), data['x']
+
+    times, data = epochs([3, 1, 2, 0], [13, 11, 12, 10], [0.5, 2.5], tmin=-0.5, tmax=0.5)
+    assert np.allclose(times, [[-0.5, 0.5], [-0.5, 0.5]]) and np.allclose(data, [[10, 11], [12, 13]])
+
+    print("OK")
@@ -0,0 +1,164 @@
+"""
+Incremental gaze heatmap and dwell-time accumulator for the Eye Tribe eye tracker (http://theeyetribe.com)
+
+Gaze samples from the push stream are binned into a NumPy grid in batches, so memory use does not
+grow with the length of the session. Smoothing is only done when the map is read.
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import threading
+import numpy as np
+from peyetribe import EyeTribe
+
+
+class Heatmap(EyeTribe.ScreenConsumer):
+
+    """
+    Accumulates gaze samples into a grid of binsize x binsize pixel bins covering the screen.
+
+    If duration is True, each sample is weighted by the tracker time since the previous sample
+    (capped at maxgap seconds), so the map holds dwell time in seconds rather than sample counts.
+    If fixonly is True, only samples flagged as fixations by the tracker are counted.
+    """
+
+    def __init__(self, width, height, binsize=10, sigma=None, attr='avg', duration=False, fixonly=False,
+                 maxgap=0.1, batch=256):
+        self._width = width
+        self._height = height
+        self._binsize = binsize
+        self._sigma = sigma
+        self._attr = attr
+        self._duration = duration
+        self._fixonly = fixonly
+        self._maxgap = maxgap
+        self._batch = batch
+
+        self._nx = int(np.ceil(width / float(binsize)))
+        self._ny = int(np.ceil(height / float(binsize)))
+        self._grid = np.zeros((self._ny, self._nx))
+        self._smoothed = None
+        self._kernels = None
+        self._lock = threading.Lock()
+
+        self._pending = []
+        self._lasttime = None
+
+    @property
+    def shape(self):
+        """The (rows, columns) shape of the grid."""
+        return (self._ny, self._nx)
+
+    def update(self, frame):
+        """Add the gaze coordinate of a single frame; frames without on-screen gaze are skipped."""
+        lasttime = self._lasttime
+        self._lasttime = frame.time
+
+        if not frame.hasgaze:
+            return
+        if self._fixonly and not frame.fix:
+            return
+
+        if self._duration:
+            if lasttime is None or frame.time <= lasttime:
+                return
+            w = min(frame.time - lasttime, self._maxgap)
+        else:
+            w = 1.0
+
+        c = getattr(frame, self._attr)
+        with self._lock:
+            self._pending.append((c.x, c.y, w))
+            full = len(self._pending) >= self._batch
+        if full:
+            self.flush()
+
+    def add_points(self, xs, ys, weights=None):
+        """Add a batch of screen coordinates (and optionally their weights) in one vectorized step."""
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        weights = np.ones(len(xs)) if weights is None else np.asarray(weights, dtype=float)
+
+        bx = np.floor(xs / self._binsize).astype(int)
+        by = np.floor(ys / self._binsize).astype(int)
+        inside = (bx >= 0) & (bx < self._nx) & (by >= 0) & (by < self._ny)
+        counts = np.bincount(by[inside] * self._nx + bx[inside], weights=weights[inside],
+                             minlength=self._nx * self._ny)
+
+        with self._lock:
+            self._grid += counts.reshape(self._ny, self._nx)
+            self._smoothed = None
+
+    def flush(self):
+        """Bin any samples still waiting in the current batch."""
+        # swap in a new list under the lock, as update() may be appending to it from the listener thread
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            p = np.array(pending, dtype=float)
+            self.add_points(p[:, 0], p[:, 1], p[:, 2])
+
+    def _gaussian(self, n, sigma):
+        r = np.arange(n)
+        k = np.exp(-0.5 * ((r[:, None] - r[None, :]) / sigma) ** 2)
+        return k / k.sum(axis=1, keepdims=True)
+
+    def map(self, smooth=True):
+        """
+        Return the accumulated grid, Gaussian smoothed with sigma (in pixels) if given and smooth is True.
+
+        The smoothed map is cached until more samples are added.
+        """
+        self.flush()
+        with self._lock:
+            if not smooth or not self._sigma:
+                return self._grid.copy()
+            if self._smoothed is None:
+                if self._kernels is None:
+                    s = self._sigma / float(self._binsize)
+                    self._kernels = (self._gaussian(self._ny, s), self._gaussian(self._nx, s))
+                ky, kx = self._kernels
+                self._smoothed = ky.dot(self._grid).dot(kx.T)
+            return self._smoothed.copy()
+
+    def total(self):
+        """The total weight (samples, or seconds if duration weighted) accumulated on the screen."""
+        self.flush()
+        with self._lock:
+            return self._grid.sum()
+
+    def snapshot(self):
+        """Return a copy of the raw (unsmoothed) grid, e.g. at the end of a trial."""
+        return self.map(smooth=False)
+
+    def reset(self):
+        """Clear the grid and any pending samples, e.g. at the start of a new trial."""
+        with self._lock:
+            self._pending = []
+            self._lasttime = None
+            self._grid = np.zeros((self._ny, self._nx))
+            self._smoothed = None
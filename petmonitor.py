@@ -0,0 +1,223 @@
+"""
+Rolling data-quality monitor for the Eye Tribe eye tracker (http://theeyetribe.com)
+
+Keeps exponentially decayed statistics of the push stream in constant memory, and calls back when
+thresholds are crossed, so tracking problems are visible while a session is still running.
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import math
+import threading
+from peyetribe import EyeTribe
+
+
+class QualityMonitor(EyeTribe.Consumer):
+
+    """
+    Rolling data-quality statistics over the push stream, in constant memory.
+
+    All statistics are exponentially decayed averages with a time constant of tau seconds of
+    tracker time (Frame.time): each frame (or interval between frames) counts the same, and its
+    weight decays by exp(-t/tau) as it gets t seconds older, so the statistics reflect roughly the
+    last tau seconds of data (frames that do not advance the tracker time are ignored):
+
+        lost, fail, presence, eyes, gaze -- share of frames with each state bit (L, F, P, E, G) set
+        rate                             -- sample rate (Hz), as frames per second of tracker time
+        gapshare                         -- share of intervals longer than gap seconds
+        lpupil, rpupil                   -- share of frames with a valid pupil size for each eye
+        jitter                           -- RMS distance (pixels) between successive gaze samples
+
+    The interval distribution is kept as a decayed histogram over the fixed bin edges in gapbins
+    (seconds), see gaps().
+
+    Thresholds are added with threshold(); the callback is called (on the listener thread) as
+    callback(monitor, name, value, violated) when the statistic crosses into violation, and again
+    with violated False when it recovers. Nothing fires until warmup frames have been seen.
+    """
+
+    stat_names = ('lost', 'fail', 'presence', 'eyes', 'gaze', 'rate', 'gapshare', 'lpupil', 'rpupil', 'jitter')
+
+    _state_bits = (
+        ('lost', EyeTribe.STATE_LOST),
+        ('fail', EyeTribe.STATE_FAIL),
+        ('presence', EyeTribe.STATE_PRESENCE),
+        ('eyes', EyeTribe.STATE_EYES),
+        ('gaze', EyeTribe.STATE_GAZE),
+    )
+
+    _sum_names = ('lost', 'fail', 'presence', 'eyes', 'gaze', 'lpupil', 'rpupil', 'frames',
+                  'gapshare', 'elapsed', 'intervals', 'jitter', 'pairs')
+
+    def __init__(self, tau=10.0, gap=0.1, gapbins=(0.02, 0.04, 0.08, 0.16, 0.32), warmup=30):
+        self._tau = tau
+        self._gap = gap
+        self._gapbins = gapbins
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._thresholds = []
+        self.reset()
+
+    def reset(self):
+        """Forget all statistics (but not the thresholds)."""
+        with self._lock:
+            self._count = 0
+            self._lasttime = None
+            self._lastgaze = None
+            self._stats = dict((name, None) for name in QualityMonitor.stat_names)
+            # decayed sums the statistics are ratios of
+            self._sums = dict((name, 0.0) for name in QualityMonitor._sum_names)
+            self._gaphist = [0.0] * (len(self._gapbins) + 1)
+            for t in self._thresholds:
+                t[4] = False
+
+    def threshold(self, name, callback, above=None, below=None):
+        """
+        Call callback when the statistic name goes above the value 'above' or below the value 'below'.
+
+        E.g. monitor.threshold('lost', warn, above=0.2) or monitor.threshold('rate', warn, below=25).
+        """
+        if name not in QualityMonitor.stat_names:
+            raise Exception("Unknown quality statistic '%s'" % name)
+        with self._lock:
+            self._thresholds.append([name, callback, above, below, False])
+
+    def _add(self, name, value, count):
+        self._sums[name] += value
+        self._stats[name] = self._sums[name] / self._sums[count]
+
+    def update(self, frame):
+        """Update the statistics with a new frame, and fire any threshold callbacks."""
+        with self._lock:
+            lasttime = self._lasttime
+            if lasttime is not None and frame.time <= lasttime:
+                # a repeated or out-of-order frame has no time to weigh it by, so it is skipped
+                return
+            self._count += 1
+            self._lasttime = frame.time
+
+            dt = None if lasttime is None else frame.time - lasttime
+            if dt is not None:
+                # age everything seen so far by dt; the new frame then counts with weight 1
+                d = math.exp(-dt / self._tau)
+                for name in self._sums:
+                    self._sums[name] *= d
+                for i in range(len(self._gaphist)):
+                    self._gaphist[i] *= d
+
+            self._sums['frames'] += 1.0
+            state = frame.state
+            for name, bit in QualityMonitor._state_bits:
+                self._add(name, 1.0 if state & bit else 0.0, 'frames')
+            self._add('lpupil', 1.0 if frame.lefteye.psize > 0 else 0.0, 'frames')
+            self._add('rpupil', 1.0 if frame.righteye.psize > 0 else 0.0, 'frames')
+
+            if dt is not None:
+                self._sums['intervals'] += 1.0
+                self._add('gapshare', 1.0 if dt > self._gap else 0.0, 'intervals')
+                self._sums['elapsed'] += dt
+                self._stats['rate'] = self._sums['intervals'] / self._sums['elapsed']
+
+                b = 0
+                while b < len(self._gapbins) and dt >= self._gapbins[b]:
+                    b += 1
+                self._gaphist[b] += 1.0
+
+            if frame.hasgaze:
+                g = (frame.avg.x, frame.avg.y)
+                if self._lastgaze is not None:
+                    self._sums['pairs'] += 1.0
+                    self._sums['jitter'] += (g[0] - self._lastgaze[0]) ** 2 + (g[1] - self._lastgaze[1]) ** 2
+                    self._stats['jitter'] = math.sqrt(self._sums['jitter'] / self._sums['pairs'])
+                self._lastgaze = g
+            else:
+                self._lastgaze = None
+
+            fire = []
+            if self._count >= self._warmup:
+                for t in self._thresholds:
+                    v = self._stats[t[0]]
+                    if v is None:
+                        continue
+                    violated = (t[2] is not None and v > t[2]) or (t[3] is not None and v < t[3])
+                    if violated != t[4]:
+                        t[4] = violated
+                        fire.append((t[1], t[0], v, violated))
+
+        # call back outside of the lock, so callbacks may read the monitor
+        for callback, name, v, violated in fire:
+            callback(self, name, v, violated)
+
+    def stats(self):
+        """Return a dict with the current value of each statistic (None until known)."""
+        with self._lock:
+            return dict(self._stats)
+
+    def gaps(self):
+        """
+        Return the decayed distribution of intervals between frames as a list of (upper edge, share) tuples.
+
+        The last upper edge is None, for the intervals longer than the last of gapbins.
+        """
+        with self._lock:
+            total = sum(self._gaphist)
+            edges = list(self._gapbins) + [None]
+            return [(e, h / total if total else 0.0) for e, h in zip(edges, self._gaphist)]
+
+
+if __name__ == "__main__":
+    """
+    Check the statistics on a simulated stream -- this code is only executed if file is run directly.
+
+    Frames come every 33 ms, except for a 1 s gap with tracking lost every 30 frames, i.e. 30 frames
+    per 1.957 s (15.3 Hz) with 1/30 of the frames lost and 1/30 of the intervals gaps.
+    """
+
+    def frame(ms, state):
+        c = {'x': 960, 'y': 540}
+        eye = {'raw': c, 'avg': c, 'psize': 20.0, 'pcenter': {'x': 0.5, 'y': 0.5}}
+        return EyeTribe.Frame({'time': ms, 'timestamp': "2026-10-18 12:00:00.000", 'fix': False, 'state': state,
+                               'raw': c, 'avg': c, 'lefteye': eye, 'righteye': eye})
+
+    mon = QualityMonitor(tau=10.0)
+    ms = 0
+    for i in range(3000):
+        if i % 30 == 29:
+            ms += 1000
+            mon.update(frame(ms, EyeTribe.STATE_LOST))
+        else:
+            ms += 33
+            mon.update(frame(ms, EyeTribe.STATE_GAZE | EyeTribe.STATE_EYES | EyeTribe.STATE_PRESENCE))
+        if i >= 300:
+            s = mon.stats()
+            assert 14.0 < s['rate'] < 17.0, s['rate']
+            assert 0.02 < s['gapshare'] < 0.05, s['gapshare']
+            assert 0.02 < s['lost'] < 0.05, s['lost']
+            assert abs(s['lost'] + s['gaze'] - 1.0) < 1e-9
+            assert 0.02 < mon.gaps()[-1][1] < 0.05, mon.gaps()
+
+    print("OK")
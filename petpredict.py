@@ -0,0 +1,159 @@
+"""
+Latency-compensated gaze prediction for the Eye Tribe eye tracker (http://theeyetribe.com)
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import time
+from peyetribe import EyeTribe
+
+
+class Predictor(EyeTribe.Consumer):
+
+    """
+    Latency-compensated gaze prediction from the push stream.
+
+    A constant-velocity Kalman filter is run per axis for the combined gaze and for each eye,
+    with the tracker timestamp of each frame as the time of the measurement. predict() then
+    extrapolates the filtered gaze to the current (or any given) wall time, e.g. the time of the
+    next vsync, compensating for the tracker-to-renderer latency.
+
+    While the filtered gaze speed exceeds saccade (pixels/second), no extrapolation is done and
+    the filtered position is returned instead. q is the process noise (pixels^2/second^3) and r
+    the measurement noise (pixels^2); the filter is restarted after gaps longer than maxgap seconds.
+    """
+
+    class _Axis():
+
+        """One-dimensional constant-velocity Kalman filter, kept in plain floats to stay cheap."""
+
+        def __init__(self, q, r):
+            self._q = q
+            self._r = r
+            self.p = None
+            self.v = 0.0
+            self._p00 = self._p01 = self._p11 = 0.0
+
+        def reset(self, z):
+            self.p = float(z)
+            self.v = 0.0
+            self._p00 = self._r
+            self._p01 = 0.0
+            self._p11 = 1e6
+
+        def update(self, z, dt):
+            # predict
+            q = self._q
+            p = self.p + self.v * dt
+            p00 = self._p00 + dt * (2 * self._p01 + dt * self._p11) + q * dt * dt * dt / 3.0
+            p01 = self._p01 + dt * self._p11 + q * dt * dt / 2.0
+            p11 = self._p11 + q * dt
+
+            # correct
+            s = p00 + self._r
+            k0 = p00 / s
+            k1 = p01 / s
+            y = z - p
+            self.p = p + k0 * y
+            self.v += k1 * y
+            self._p00 = (1 - k0) * p00
+            self._p01 = (1 - k0) * p01
+            self._p11 = p11 - k1 * p01
+
+    class _Gaze():
+        def __init__(self, q, r):
+            self.x = Predictor._Axis(q, r)
+            self.y = Predictor._Axis(q, r)
+            self.t = None
+
+        def update(self, c, t, maxgap):
+            if self.t is None or t <= self.t or t - self.t > maxgap:
+                self.x.reset(c.x)
+                self.y.reset(c.y)
+            else:
+                dt = t - self.t
+                self.x.update(c.x, dt)
+                self.y.update(c.y, dt)
+            self.t = t
+
+        def speed(self):
+            return (self.x.v ** 2 + self.y.v ** 2) ** 0.5
+
+    def __init__(self, q=5e6, r=400.0, saccade=1500.0, maxahead=0.1, maxgap=0.2, attr='avg'):
+        self._saccade = saccade
+        self._maxahead = maxahead
+        self._maxgap = maxgap
+        self._attr = attr
+        self._gaze = {
+            None: Predictor._Gaze(q, r),
+            'left': Predictor._Gaze(q, r),
+            'right': Predictor._Gaze(q, r),
+        }
+        self._latency = None
+
+    def update(self, frame):
+        """Update the filters with a new frame; frames without on-screen gaze are skipped."""
+        # exponentially averaged receipt latency, from tracker frame creation to unpacking here
+        lat = frame.etime - frame.timestamp
+        self._latency = lat if self._latency is None else self._latency + 0.05 * (lat - self._latency)
+
+        if not frame.hasgaze:
+            return
+
+        t = frame.timestamp
+        self._gaze[None].update(getattr(frame, self._attr), t, self._maxgap)
+        self._gaze['left'].update(getattr(frame.lefteye, self._attr), t, self._maxgap)
+        self._gaze['right'].update(getattr(frame.righteye, self._attr), t, self._maxgap)
+
+    @property
+    def latency(self):
+        """The (smoothed) latency in seconds from the tracker creating a frame to it being received."""
+        return self._latency
+
+    def in_saccade(self, eye=None):
+        """True if the filtered gaze speed of the combined gaze (or eye 'left' or 'right') indicates a saccade."""
+        g = self._gaze[eye]
+        return g.t is not None and g.speed() > self._saccade
+
+    def predict(self, t=None, eye=None):
+        """
+        Return the predicted (x, y) gaze at wall time t (default: now), or None if there is no gaze yet.
+
+        eye can be None for the combined gaze, or 'left' or 'right'. The prediction horizon is
+        limited to maxahead seconds, and during saccades the filtered position is returned as is.
+        """
+        g = self._gaze[eye]
+        if g.t is None:
+            return None
+        if t is None:
+            t = time.time()
+
+        ahead = min(max(t - g.t, 0.0), self._maxahead)
+        if g.speed() > self._saccade:
+            ahead = 0.0
+
+        return (g.x.p + g.x.v * ahead, g.y.p + g.y.v * ahead)
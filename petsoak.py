@@ -0,0 +1,491 @@
+"""
+Soak test for the peyetribe interface to the Eye Tribe eye tracker (http://theeyetribe.com)
+
+Runs EyeTribe against a local fake tracker at high frame rates for hours of simulated tracker time,
+sampling memory, threads, queue depth and latency to detect leaks and latency drift.
+
+See README.md for instructions
+
+Created by the peyetribe contributors, October 2026
+
+Licensed under the MIT License:
+
+Copyright (c) 2026, the peyetribe contributors
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the "Software"), to deal in the Software without restriction, including without
+limitation the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the
+Software, and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions
+of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT
+LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+__author__ = "peyetribe contributors"
+__copyright__ = "Copyright (c) 2026, the peyetribe contributors"
+__license__ = "MIT"
+__version__ = "0.1"
+__status__ = "Alpha"
+
+import sys
+import time
+import threading
+import socket
+import json
+import argparse
+from peyetribe import EyeTribe
+
+if sys.version_info[0] == 2:
+    tracemalloc = None  # not available on python 2; memory is then not sampled
+else:
+    import tracemalloc
+
+
+class FakeTracker():
+
+    """
+    A local fake Eye Tribe server, speaking enough of the tracker protocol for EyeTribe to run against it.
+
+    In pushmode, frames are sent at rate frames per (real) second, while the tracker clock in the
+    frames advances by 1/trackerrate seconds per frame, so hours of tracker time can be simulated in
+    minutes. The heartbeat interval (in ms) is reported to the client as the real tracker does.
+
+    To exercise the client, each message can be split over two writes (split), and a number of
+    frames can still be pushed right after replying to a switch to pull mode (lag), as if in flight.
+    """
+
+    def __init__(self, host='localhost', port=0, rate=1000.0, trackerrate=30.0, hbinterval=250,
+                 screenres=(1920, 1080), split=False, lag=0):
+        self._rate = rate
+        self._trackerrate = trackerrate
+        self._hbinterval = hbinterval
+        self._screenres = screenres
+        self._split = split
+        self._lag = lag
+        self._frames = 0
+        self._running = True
+        self.lastreply = None
+
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen(5)
+        self._server.settimeout(0.5)
+        self.host, self.port = self._server.getsockname()[:2]
+
+        self._acceptor = threading.Thread(target=self._accept_thread)
+        self._acceptor.daemon = True
+        self._acceptor.start()
+
+    @property
+    def frames(self):
+        """The number of frames pushed so far (over all connections)."""
+        return self._frames
+
+    @property
+    def replied_time(self):
+        """The tracker time (in seconds) of the last frame sent as a reply to a get request, if any."""
+        return None if self.lastreply is None else self.lastreply['time'] / 1000.0
+
+    @property
+    def simulated_time(self):
+        """The tracker time (in seconds) simulated so far."""
+        return self._frames / self._trackerrate
+
+    def stop(self):
+        self._running = False
+        self._acceptor.join(2)
+        self._server.close()
+
+    def _frame(self):
+        t = self._frames / self._trackerrate
+        ts = time.time()
+        x = 960 + int(200 * ((self._frames % 60) / 30.0 - 1))
+        c = {'x': x, 'y': 540}
+        eye = {'raw': c, 'avg': c, 'psize': 20.0, 'pcenter': {'x': 0.45, 'y': 0.5}}
+        self._frames += 1
+        return {
+            'time': int(t * 1000), 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) +
+            ".%03d" % int((ts % 1) * 1000), 'fix': False, 'state': 7,
+            'raw': c, 'avg': c, 'lefteye': eye, 'righteye': eye
+        }
+
+    def _accept_thread(self):
+        while self._running:
+            try:
+                conn, addr = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(0.5)
+            th = threading.Thread(target=self._connection_thread, args=(conn,))
+            th.daemon = True
+            th.start()
+
+    def _connection_thread(self, conn):
+        state = {'push': False, 'open': True, 'points': 0, 'pointcount': 9}
+        # frames are made and sent under the lock, so they go out in the order of their tracker time
+        lock = threading.RLock()
+
+        def send(msg):
+            data = (json.dumps(msg) + "\n").encode()
+            with lock:
+                if self._split:
+                    # give the client a chance to read the first part on its own
+                    conn.sendall(data[:len(data) // 2])
+                    time.sleep(0.001)
+                    data = data[len(data) // 2:]
+                conn.sendall(data)
+
+        def push():
+            with lock:
+                send({'category': 'tracker', 'request': 'get', 'statuscode': 200, 'values': {'frame': self._frame()}})
+
+        def _pusher_thread():
+            # send frames in small bursts, as sleeping for each frame is too coarse at high rates
+            burst = max(1, int(self._rate / 100))
+            nxt = time.time()
+            while state['open'] and self._running:
+                if state['push']:
+                    try:
+                        for i in range(burst):
+                            push()
+                    except (socket.error, OSError):
+                        break
+                nxt += burst / self._rate
+                time.sleep(max(0, nxt - time.time()))
+                if time.time() - nxt > 1.0:
+                    nxt = time.time()
+
+        pusher = threading.Thread(target=_pusher_thread)
+        pusher.daemon = True
+        pusher.start()
+
+        decoder = json.JSONDecoder()
+        buf = ""
+        try:
+            while self._running:
+                try:
+                    r = conn.recv(4096)
+                except socket.timeout:
+                    continue
+                if not r:
+                    break
+                buf += r.decode()
+                while True:
+                    buf = buf.lstrip()
+                    try:
+                        msg, n = decoder.raw_decode(buf)
+                    except ValueError:
+                        break
+                    buf = buf[n:]
+                    with lock:
+                        send(self._reply(msg, state))
+                        if msg.get('request') == 'set' and msg['values'].get('push') is False:
+                            for i in range(self._lag):
+                                push()
+        except (socket.error, OSError):
+            pass
+        finally:
+            state['open'] = False
+            pusher.join(2)
+            conn.close()
+
+    def _reply(self, msg, state):
+        cat = msg['category']
+        req = msg.get('request')
+        reply = {'category': cat, 'statuscode': 200}
+        if req is not None:
+            reply['request'] = req
+
+        if cat == 'tracker' and req == 'get':
+            known = {'iscalibrated': True, 'heartbeatinterval': self._hbinterval, 'push': state['push'],
+                     'screenresw': self._screenres[0], 'screenresh': self._screenres[1]}
+            values = {}
+            for v in msg['values']:
+                values[v] = self._frame() if v == 'frame' else known.get(v)
+            if 'frame' in values:
+                self.lastreply = values['frame']
+            reply['values'] = values
+        elif cat == 'tracker' and req == 'set':
+            state['push'] = msg['values'].get('push', state['push'])
+        elif cat == 'calibration' and req == 'start':
+            state['pointcount'] = msg['values']['pointcount']
+            state['points'] = 0
+        elif cat == 'calibration' and req == 'pointend':
+            state['points'] += 1
+            if state['points'] == state['pointcount']:
+                reply['values'] = {'calibresult': self._calibresult(state['pointcount'])}
+
+        return reply
+
+    def _calibresult(self, pointcount):
+        cp = {'state': 2, 'cp': {'x': 960, 'y': 540}, 'acd': {'ad': 0.5, 'adl': 0.5, 'adr': 0.5},
+              'mepix': {'mep': 20, 'mepl': 20, 'mepr': 20}, 'asdp': {'asd': 5, 'asdl': 5, 'asdr': 5}}
+        return {'result': True, 'deg': 0.5, 'degl': 0.5, 'degr': 0.5, 'calibpoints': [cp] * pointcount}
+
+
+class SoakSample():
+    def __init__(self, t, simtime, memory, threads, qsize, frames, p99):
+        self.t = t
+        self.simtime = simtime
+        self.memory = memory
+        self.threads = threads
+        self.qsize = qsize
+        self.frames = frames
+        self.p99 = p99
+
+
+class SoakResult():
+    def __init__(self):
+        self.passed = True
+        self.reasons = []
+        self.samples = []
+        self.memslope = None
+        self.latslope = None
+        self.qslope = None
+        self.cycles = 0
+
+    def fail(self, reason):
+        self.passed = False
+        self.reasons.append(reason)
+
+
+def _slope(xs, ys):
+    """Least-squares slope of ys over xs (0 if it cannot be determined)."""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx = sum(xs) / float(n)
+    my = sum(ys) / float(n)
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+
+
+def _p99(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(0.99 * len(values)))]
+
+
+def check_protocol(cycles=10, timeout=30.0, log=sys.stdout):
+    """
+    Check EyeTribe against FakeTrackers that split every message over two reads, and that keep pushing
+    frames for a moment after replying to a switch to pull mode.
+
+    In each of the given number of pushmode()/pullmode() cycles, the pushed frames must arrive in order
+    and be newer than the last pulled one, next() in pull mode must return the frame sent as the reply
+    (not one still in flight), and a calibration request must complete. The check fails if a tracker
+    setup has not finished within timeout seconds, e.g. because the listener thread died.
+
+    Returns a SoakResult.
+    """
+    res = SoakResult()
+
+    def _run(server, tracker, name):
+        tracker.connect()
+        last = None
+        for i in range(cycles):
+            tracker.pushmode()
+            for j in range(5):
+                ef = tracker.next()
+                if last is not None and ef.time <= last:
+                    res.fail("%s: pushed frame from %.3f s after one from %.3f s" % (name, ef.time, last))
+                last = ef.time
+            tracker.pullmode()
+            ef = tracker.next()
+            if ef.time != server.replied_time:
+                res.fail("%s: next() in pull mode returned the frame from %.3f s instead of the reply from %.3f s" %
+                         (name, ef.time, server.replied_time))
+            last = ef.time
+            tracker.calibration_start_async(9).result(10.0)
+            res.cycles += 1
+        tracker.close()
+
+    for split, lag in ((True, 0), (False, 5), (True, 5)):
+        name = "split %s, lag %d" % (split, lag)
+        server = FakeTracker(rate=300.0, split=split, lag=lag)
+        tracker = EyeTribe(port=server.port)
+        error = []
+
+        def _checker_thread():
+            try:
+                _run(server, tracker, name)
+            except Exception as e:
+                error.append(e)
+
+        checker = threading.Thread(target=_checker_thread)
+        checker.daemon = True
+        checker.start()
+        checker.join(timeout)
+        if checker.is_alive():
+            res.fail("%s: did not finish within %.0f s" % (name, timeout))
+        elif error:
+            res.fail("%s: %s" % (name, error[0]))
+        server.stop()
+        log.write("check: %s done, %d cycles\n" % (name, res.cycles))
+
+    return res
+
+
+def soak(hours=1.0, rate=2000.0, trackerrate=30.0, interval=2.0, cycles=20, warmup=0.2,
+         memtol=1024 * 1024, lattol=0.005, qtol=100, log=sys.stdout):
+    """
+    Run EyeTribe against a FakeTracker for the given hours of simulated tracker time, and check for trends.
+
+    While frames are pushed at rate frames per second and consumed with next() on a separate thread,
+    the traced memory, thread count, frame queue depth and 99th percentile receipt-to-consume latency
+    (from Frame.etime to next() returning it) are sampled every interval seconds. Afterwards, the
+    connection is taken through the given number of pullmode()/pushmode() and close()/connect() cycles,
+    each also running a request on the tracker's worker thread.
+
+    The run fails if the memory grows by more than memtol bytes, the p99 latency by more than lattol
+    seconds or the queue depth by more than qtol frames over the run (ignoring the first warmup share
+    of samples), if frames are left queued or memory has grown after the cycles, or if threads are
+    left behind.
+
+    Returns a SoakResult.
+    """
+    res = SoakResult()
+    basethreads = threading.active_count()
+    server = FakeTracker(rate=rate, trackerrate=trackerrate)
+    tracker = EyeTribe(port=server.port)
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    def memory():
+        return tracemalloc.get_traced_memory()[0] if tracemalloc is not None else 0
+
+    tracker.connect()
+    tracker.pushmode()
+
+    latencies = [[]]
+    consumed = [0]
+    running = [True]
+
+    def _consumer_thread():
+        while running[0]:
+            ef = tracker.next(False)
+            if ef is None:
+                time.sleep(0.0002)
+                continue
+            latencies[0].append(time.time() - ef.etime)
+            consumed[0] += 1
+
+    consumer = threading.Thread(target=_consumer_thread)
+    consumer.daemon = True
+    consumer.start()
+
+    start = time.time()
+    simend = hours * 3600.0
+    while server.simulated_time < simend:
+        time.sleep(interval)
+        # swap in a new list, so samples appended meanwhile go to either the old or the new one
+        lat, latencies[0] = latencies[0], []
+        s = SoakSample(time.time() - start, server.simulated_time, memory(), threading.active_count(),
+                       tracker._frameq.qsize(), consumed[0], _p99(lat))
+        res.samples.append(s)
+        log.write("soak: %7.1fs real, %8.1fs tracker, mem %9d B, threads %d, queue %6d, frames %9d, p99 %s\n" %
+                  (s.t, s.simtime, s.memory, s.threads, s.qsize, s.frames,
+                   "%.2f ms" % (s.p99 * 1000) if s.p99 is not None else "-"))
+
+    running[0] = False
+    consumer.join(2)
+
+    # trends over the steady-state part of the run
+    steady = [s for s in res.samples[int(len(res.samples) * warmup):] if s.p99 is not None]
+    if len(steady) >= 2:
+        ts = [s.t for s in steady]
+        span = ts[-1] - ts[0]
+        res.memslope = _slope(ts, [s.memory for s in steady])
+        res.latslope = _slope(ts, [s.p99 for s in steady])
+        res.qslope = _slope(ts, [s.qsize for s in steady])
+        if res.memslope * span > memtol:
+            res.fail("memory grew by %d bytes over %.0f s" % (res.memslope * span, span))
+        if res.latslope * span > lattol:
+            res.fail("p99 latency grew by %.2f ms over %.0f s" % (res.latslope * span * 1000, span))
+        if res.qslope * span > qtol:
+            res.fail("frame queue grew by %d frames over %.0f s" % (res.qslope * span, span))
+    else:
+        res.fail("too few samples to detect trends; run for longer")
+
+    # mode and connection cycles
+    for i in range(cycles):
+        tracker.pullmode()
+        tracker.next()
+        tracker.pushmode()
+        tracker.next()
+        tracker.pullmode()
+        tracker.calibration_start_async(9).result(10.0)
+        tracker.close()
+        tracker.connect()
+        tracker.pushmode()
+        tracker.next()
+        res.cycles += 1
+    tracker.pullmode()
+    tracker.close()
+
+    # frames pushed but not consumed must be discarded by pullmode() and close(), not held on to
+    queued = tracker._frameq.qsize()
+    mem = memory()
+    if queued:
+        res.fail("%d frames left queued after pullmode() and close()" % queued)
+    if res.samples and mem - res.samples[-1].memory > memtol:
+        res.fail("memory grew by %d bytes over the cycles" % (mem - res.samples[-1].memory))
+
+    # give the server side a moment to notice the closed connection before counting threads
+    server.stop()
+    time.sleep(1.0)
+    log.write("soak: %d cycles done, %d frames left queued, mem %d B, threads %d (started with %d)\n" %
+              (res.cycles, queued, mem, threading.active_count(), basethreads))
+    if threading.active_count() > basethreads:
+        res.fail("threads left behind after cycles: %d (started with %d)" % (threading.active_count(), basethreads))
+
+    if tracemalloc is not None:
+        tracemalloc.stop()
+
+    return res
+
+
+if __name__ == "__main__":
+    """
+    Run the soak test from the command line, e.g.
+
+        python petsoak.py --hours 4 --rate 3000
+
+    or only check the protocol handling with python petsoak.py --check
+    """
+
+    parser = argparse.ArgumentParser(description="Soak test peyetribe against a local fake tracker")
+    parser.add_argument("--hours", type=float, default=1.0, help="hours of simulated tracker time")
+    parser.add_argument("--rate", type=float, default=2000.0, help="frames pushed per real second")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between samples")
+    parser.add_argument("--cycles", type=int, default=20, help="pushmode/pullmode and close/connect cycles")
+    parser.add_argument("--memtol", type=int, default=1024 * 1024, help="allowed memory growth (bytes)")
+    parser.add_argument("--lattol", type=float, default=5.0, help="allowed p99 latency growth (ms)")
+    parser.add_argument("--qtol", type=int, default=100, help="allowed frame queue growth (frames)")
+    parser.add_argument("--check", action="store_true", help="only check split replies and mode switches")
+    args = parser.parse_args()
+
+    if args.check:
+        res = check_protocol(cycles=args.cycles)
+    else:
+        res = soak(hours=args.hours, rate=args.rate, interval=args.interval, cycles=args.cycles,
+                   memtol=args.memtol, lattol=args.lattol / 1000.0, qtol=args.qtol)
+
+    if res.passed:
+        print("PASSED")
+    else:
+        print("FAILED: " + "; ".join(res.reasons))
+        sys.exit(1)
@@ -45,6 +45,8 @@ from datetime import datetime
 import threading
 import socket
 import json
+import math
+from collections import deque
 
 
 class EyeTribe():
@@ -70,12 +72,20 @@ class EyeTribe():
     etm_set_push = '{ "category": "tracker", "request" : "set", "values": { "push": true } }'
     etm_set_pull = '{ "category": "tracker", "request" : "set", "values": { "push": false } }'
 
-    etm_get_frame = '{ "category": "tracker", "request" : "get", "values": [ "frame" ] }'
+    # push is asked for as well, so the reply can be told apart from pushed frames (which only hold the frame)
+    etm_get_frame = '{ "category": "tracker", "request" : "get", "values": [ "frame", "push" ] }'
 
     etm_heartbeat = '{ "category": "heartbeat" }'
 
     etm_buffer_size = 4096
 
+    # bits of the frame state value, see README.md
+    STATE_GAZE = 0x01
+    STATE_EYES = 0x02
+    STATE_PRESENCE = 0x04
+    STATE_FAIL = 0x08
+    STATE_LOST = 0x10
+
     class Coord():
 
         """Single (x,y) positions relative to screen or bounding box. Used in Frame and Calibration."""
@@ -249,6 +259,11 @@ class EyeTribe():
         def state(self, val):
             self._state = val
 
+        @property
+        def hasgaze(self):
+            """True if the frame has on-screen gaze coordinates, i.e. the G state bit is set and tracking is not lost."""
+            return bool(self._state & EyeTribe.STATE_GAZE) and not (self._state & EyeTribe.STATE_LOST)
+
         @property
         def avg(self):
             """An averaged fixation coordinate based on both eyes."""
@@ -331,6 +346,301 @@ class EyeTribe():
             self.asdl = None
             self.asdr = None
 
+    class Validation():
+        def __init__(self):
+            self.result = False
+            self.deg = None
+            self.degl = None
+            self.degr = None
+            self.rms = None
+            self.rmsl = None
+            self.rmsr = None
+            self.loss = None
+            self.lossl = None
+            self.lossr = None
+            self.pointcount = 0
+            self.points = None
+
+    class ValidationPoint():
+        def __init__(self):
+            self.tp = EyeTribe.Coord()
+            self.samples = 0
+            self.ad = None
+            self.adl = None
+            self.adr = None
+            self.rms = None
+            self.rmsl = None
+            self.rmsr = None
+            self.loss = None
+            self.lossl = None
+            self.lossr = None
+
+    class Consumer():
+
+        """
+        Base class for objects that consume the frames of the push stream.
+
+        An instance can be given directly to pushmode() (or used in a Pipeline sink), as it is
+        callable with a frame. Subclasses implement update(frame); the frame is always passed on
+        to be queued as normal.
+        """
+
+        def __call__(self, frame):
+            self.update(frame)
+            return False
+
+        def update(self, frame):
+            raise NotImplementedError
+
+    class ScreenConsumer(Consumer):
+
+        """A Consumer covering the screen, created with the screen width and height as first arguments."""
+
+        @classmethod
+        def for_tracker(cls, tracker, *args, **kwargs):
+            """Create an instance sized to the screen resolution reported by a connected tracker."""
+            width, height = tracker.get_screen_res()
+            return cls(width, height, *args, **kwargs)
+
+    class Marker():
+        def __init__(self, label, etime):
+            self.label = label
+            self.etime = etime
+
+    class Request():
+
+        """
+        A tracker request running in the background; returned by the *_async methods.
+
+        Use done() to poll for completion without blocking, or wait() and result() to block for it.
+        """
+
+        def __init__(self, callback=None):
+            self._event = threading.Event()
+            self._callback = callback
+            self._result = None
+            self._error = None
+
+        def _finish(self, result=None, error=None):
+            self._result = result
+            self._error = error
+            self._event.set()
+            if self._callback is not None:
+                self._callback(self)
+
+        def done(self):
+            """True when the request has completed (successfully or not)."""
+            return self._event.is_set()
+
+        def wait(self, timeout=None):
+            """Wait for the request to complete; returns done()."""
+            self._event.wait(timeout)
+            return self._event.is_set()
+
+        def result(self, timeout=None):
+            """Wait for and return the result of the request, re-raising any exception it failed with."""
+            if not self.wait(timeout):
+                raise Exception("Tracker request did not complete within %s seconds" % timeout)
+            if self._error is not None:
+                raise self._error
+            return self._result
+
+    class Pipeline():
+
+        """
+        A chain of streaming operators that frames pass through in pushmode.
+
+        Build the chain by calling the operator methods in order, and hand it to pushmode()
+        instead of a callback:
+
+            p = EyeTribe.Pipeline().state(require=EyeTribe.STATE_GAZE).decimate(2).one_euro().sink(cb)
+            tracker.pushmode(p)
+
+        Operators that only need the raw values from the tracker (state, decimate and filter with
+        raw=True) are evaluated on the unpacked json values when they come before all other
+        operators, so frames they drop are never decoded into Frame and Coord objects.
+
+        Frames that make it through the whole chain are queued for next(), unless a sink
+        callback returns True, just as for a plain pushmode callback.
+
+        Note that the operators are run on the sockets listener thread!
+        """
+
+        class _Decimate():
+            def __init__(self, n):
+                self._n = n
+                self._count = -1
+
+            def __call__(self, item):
+                self._count = (self._count + 1) % self._n
+                return item if self._count == 0 else None
+
+        class _MovingAverage():
+            def __init__(self, n, attr):
+                self._n = n
+                self._attr = attr
+                self._xs = deque()
+                self._ys = deque()
+                self._sx = 0.0
+                self._sy = 0.0
+
+            def __call__(self, frame):
+                c = getattr(frame, self._attr)
+                self._xs.append(c.x)
+                self._ys.append(c.y)
+                self._sx += c.x
+                self._sy += c.y
+                if len(self._xs) > self._n:
+                    self._sx -= self._xs.popleft()
+                    self._sy -= self._ys.popleft()
+                setattr(frame, self._attr, EyeTribe.Coord(self._sx / len(self._xs), self._sy / len(self._ys)))
+                return frame
+
+        class _OneEuro():
+            def __init__(self, mincutoff, beta, dcutoff, attr):
+                self._mincutoff = mincutoff
+                self._beta = beta
+                self._dcutoff = dcutoff
+                self._attr = attr
+                self._t = None
+                self._x = None
+                self._dx = None
+
+            @staticmethod
+            def _alpha(cutoff, dt):
+                tau = 1.0 / (2 * math.pi * cutoff)
+                return 1.0 / (1.0 + tau / dt)
+
+            def __call__(self, frame):
+                c = getattr(frame, self._attr)
+                x = (c.x, c.y)
+                if self._t is None or frame.time <= self._t:
+                    self._x = x
+                    self._dx = (0.0, 0.0)
+                else:
+                    dt = frame.time - self._t
+                    a = self._alpha(self._dcutoff, dt)
+                    dx = [(x[i] - self._x[i]) / dt for i in range(2)]
+                    self._dx = tuple(a*dx[i] + (1-a)*self._dx[i] for i in range(2))
+                    a = [self._alpha(self._mincutoff + self._beta*abs(self._dx[i]), dt) for i in range(2)]
+                    self._x = tuple(a[i]*x[i] + (1-a[i])*self._x[i] for i in range(2))
+                self._t = frame.time
+                setattr(frame, self._attr, EyeTribe.Coord(self._x[0], self._x[1]))
+                return frame
+
+        class _Region():
+            def __init__(self, left, top, width, height, normalize, drop):
+                self._left = left
+                self._top = top
+                self._width = width
+                self._height = height
+                self._normalize = normalize
+                self._drop = drop
+
+            def _map(self, c):
+                x = c.x - self._left
+                y = c.y - self._top
+                if self._normalize:
+                    return EyeTribe.Coord(x / float(self._width), y / float(self._height), fmt="%.3f")
+                return EyeTribe.Coord(x, y)
+
+            def __call__(self, frame):
+                if self._drop and not (0 <= frame.avg.x - self._left < self._width and
+                                       0 <= frame.avg.y - self._top < self._height):
+                    return None
+                frame.raw = self._map(frame.raw)
+                frame.avg = self._map(frame.avg)
+                for eye in (frame.lefteye, frame.righteye):
+                    eye.raw = self._map(eye.raw)
+                    eye.avg = self._map(eye.avg)
+                return frame
+
+        def __init__(self):
+            self._raw_ops = []
+            self._frame_ops = []
+
+        def _add(self, op, raw=False):
+            if raw and not self._frame_ops:
+                self._raw_ops.append(op)
+            elif raw:
+                self._frame_ops.append(lambda frame: frame if op(frame.json) is not None else None)
+            else:
+                self._frame_ops.append(op)
+            return self
+
+        def filter(self, predicate, raw=False):
+            """
+            Drop frames for which predicate returns False.
+
+            If raw is True, the predicate is given the unpacked json values from the tracker
+            (as in Frame.json) rather than a Frame, which is much cheaper if it comes first.
+            """
+            return self._add(lambda item: item if predicate(item) else None, raw)
+
+        def state(self, require=0, reject=None):
+            """
+            Keep only frames with all the require state bits set and none of the reject bits set.
+
+            By default (reject is None), frames where tracking was lost or failed are dropped.
+            """
+            if reject is None:
+                reject = EyeTribe.STATE_LOST | EyeTribe.STATE_FAIL
+            return self._add(lambda js: js if (js['state'] & require) == require and not (js['state'] & reject) else None,
+                             raw=True)
+
+        def decimate(self, n):
+            """Keep only every n'th frame (starting with the first one)."""
+            return self._add(EyeTribe.Pipeline._Decimate(n), raw=True)
+
+        def moving_average(self, n=5, attr='avg'):
+            """Replace the frame coordinate attr ('avg' or 'raw') with the mean of the last n frames."""
+            return self._add(EyeTribe.Pipeline._MovingAverage(n, attr))
+
+        def one_euro(self, mincutoff=1.0, beta=0.007, dcutoff=1.0, attr='avg'):
+            """
+            Smooth the frame coordinate attr ('avg' or 'raw') with a 1-euro filter.
+
+            mincutoff (Hz) and beta trade jitter at low speeds for lag at high speeds; see
+            Casiez et al., "1 euro filter", CHI 2012. The tracker time is used as the time base.
+            """
+            return self._add(EyeTribe.Pipeline._OneEuro(mincutoff, beta, dcutoff, attr))
+
+        def region(self, left, top, width, height, normalize=False, drop=False):
+            """
+            Map all gaze coordinates to be relative to the screen region given (in pixels).
+
+            If normalize is True, coordinates are scaled to 0..1 within the region. If drop is True,
+            frames with the averaged gaze coordinate outside of the region are dropped.
+            """
+            return self._add(EyeTribe.Pipeline._Region(left, top, width, height, normalize, drop))
+
+        def sink(self, callback):
+            """
+            Invoke callback with each frame reaching this point.
+
+            As for a pushmode callback, the callback can return True to stop further processing
+            (and queueing) of the frame.
+            """
+            return self._add(lambda frame: None if callback(frame) else frame)
+
+        def feed(self, js):
+            """
+            Run the unpacked json values of a frame through the pipeline.
+
+            Returns the resulting Frame, or None if it was dropped or consumed on the way.
+            """
+            for op in self._raw_ops:
+                if op(js) is None:
+                    return None
+
+            frame = EyeTribe.Frame(js)
+            for op in self._frame_ops:
+                frame = op(frame)
+                if frame is None:
+                    return None
+
+            return frame
+
     def __init__(self, host='localhost', port=6555, ssep=';', screenindex=0):
         """
         Create an EyeTribe connection object that can be used to connect to an eye tracker.
@@ -353,6 +663,9 @@ class EyeTribe():
         self._ssep = ssep
         self._screenindex = screenindex
         self._calibres = EyeTribe.Calibration()
+        self._markers = []
+        self._worker = None
+        self._workq = q.Queue()
 
     def _tell_tracker(self, message):
         """
@@ -362,12 +675,15 @@ class EyeTribe():
         """
         if not self._listener:
             raise Exception("Internal error; listener is not running so we cannot get replies from the tracker!")
-        if not self._replyq.empty():
-            raise Exception("Tracker protocol error; we have a queue reply before asking for something: %s" % (self._replyq.get()))
 
         # lock semaphore to ensure we're the only ones opening a request that expects a reply from the tracker
+        # (the request worker thread may be talking to the tracker too, so check for stray replies after that)
         self._reply_lock.acquire()
 
+        if not self._replyq.empty():
+            self._reply_lock.release()
+            raise Exception("Tracker protocol error; we have a queue reply before asking for something: %s" % (self._replyq.get()))
+
         self._sock.send(message.encode())
 
         reply = self._replyq.get(True)
@@ -406,13 +722,31 @@ class EyeTribe():
             Currently assumes there are continous heartbeats, otherwise we will time out at some point...
             """
             sys.stderr.write("_listener starting\n")
+            pending = b""
             while self._sock:
                 # Keep going until we're asked to terminate (or we timeout with an error)
                 try:
-                    r = self._sock.recv(EyeTribe.etm_buffer_size)
-
-                    # Multiple replies handled assuming non-documented \n is sent from the tracker, but (TODO) not split frames,
-                    for js in r.decode().split("\n"):
+                    s = self._sock
+                    r = s.recv(EyeTribe.etm_buffer_size) if s else b""
+                    if not r:
+                        if self._sock:
+                            raise Exception("The connection was closed by the tracker")
+                        break
+
+                    # Multiple replies handled assuming non-documented \n is sent from the tracker; a reply
+                    # split over several reads is kept pending until the rest of it arrives
+                    lines = (pending + r).split(b"\n")
+                    pending = lines.pop()
+                    if pending.strip():
+                        # but do not hold on to a complete reply just because the \n is missing
+                        try:
+                            json.loads(pending.decode())
+                            lines.append(pending)
+                            pending = b""
+                        except ValueError:
+                            pass
+                    for js in lines:
+                        js = js.decode()
                         if js.strip() != "":
                             f = json.loads(js)
 
@@ -422,16 +756,24 @@ class EyeTribe():
                                 pass
                             elif f['category'] == 'calibration' and sc == 800:
                                 pass
-                            elif self._ispushmode and 'values' in f and 'frame' in f['values']:
+                            elif 'values' in f and 'frame' in f['values'] and 'push' not in f['values']:
+                                # a pushed frame; if still in flight after switching to pullmode, nobody wants it
+                                if not self._ispushmode:
+                                    continue
+
                                 if sc != 200:
                                     raise Exception("Connection failed, protocol error (%d)", sc)
 
-                                ef = EyeTribe.Frame(f['values']['frame'])
-
-                                if self._pmcallback != None:
-                                    dont_queue = self._pmcallback(ef)
+                                if isinstance(self._pmcallback, EyeTribe.Pipeline):
+                                    ef = self._pmcallback.feed(f['values']['frame'])
+                                    dont_queue = ef is None
                                 else:
-                                    dont_queue = False
+                                    ef = EyeTribe.Frame(f['values']['frame'])
+
+                                    if self._pmcallback != None:
+                                        dont_queue = self._pmcallback(ef)
+                                    else:
+                                        dont_queue = False
 
                                 if not dont_queue:
                                     self._frameq.put(ef)
@@ -513,9 +855,53 @@ class EyeTribe():
             self._listener = None
             self._hbeater = None
 
+            # frames pushed but never read would otherwise be kept until the next pushmode()
+            self._clear_frames()
+
+            if self._worker is not None:
+                self._workq.put(None)
+                if not quick:
+                    self._worker.join(10)
+                self._worker = None
+
         else:
             raise Exception("cannot close an already closed connection")
 
+    def _async(self, callback, func, *args):
+        """
+        Queue func(*args) to be run on the request worker thread, and return an EyeTribe.Request for it.
+
+        Requests are run one at a time in the order they are queued. The callback, if given, is
+        invoked with the Request on the worker thread when it completes.
+        """
+
+        def _worker_thread():
+            while True:
+                item = self._workq.get()
+                if item is None:
+                    break
+                req, f, a = item
+                try:
+                    res = f(*a)
+                except Exception as e:
+                    res, err = None, e
+                else:
+                    err = None
+
+                try:
+                    req._finish(res, err)
+                except Exception as e:
+                    sys.stderr.write("_worker request callback failed: %s\n" % e)
+
+        if self._worker is None:
+            self._worker = threading.Thread(target=_worker_thread)
+            self._worker.daemon = True
+            self._worker.start()
+
+        req = EyeTribe.Request(callback)
+        self._workq.put((req, func, args))
+        return req
+
     def pushmode(self, callback=None):
         """
         Change to push mode, i.e. setup and start receiving tracking data
@@ -527,6 +913,9 @@ class EyeTribe():
         The callback can return True to indicate that no further processing should be done
         on the frame; otherwise the frame will be queued as normal for later retrieval by next().
 
+        Instead of a callback, an EyeTribe.Pipeline can be given; frames are then fed through
+        its operators and queued only if they come out at the end of it.
+
         Note that the callback is called on the sockets listener thread!
         """
 
@@ -537,23 +926,44 @@ class EyeTribe():
         if callback!=None:
             self._pmcallback = callback
 
-        self._tell_tracker(EyeTribe.etm_set_push)
-
+        # frames may arrive before the reply, so be ready to queue them already
         self._ispushmode = True
+        try:
+            self._tell_tracker(EyeTribe.etm_set_push)
+        except Exception:
+            self._ispushmode = False
+            raise
 
     def pullmode(self):
         """
         Change to pull mode, i.e. prompt by calling next() whenever you pull for a frame.
 
+        Any pushed frames not yet read with next() are discarded.
+
         Requires a connected tracker that also has been calibrated
         """
 
         if self._ispushmode:
-            self._tell_tracker(EyeTribe.etm_set_pull)
+            # frames still arriving are not wanted any more, and the ones already queued are discarded
+            # once the reply is in (the listener is done with any frame it got before that)
             self._ispushmode = False
+            try:
+                self._tell_tracker(EyeTribe.etm_set_pull)
+            except Exception:
+                self._ispushmode = True
+                raise
+            self._clear_frames()
 
         self._pmcallback = None
 
+    def _clear_frames(self):
+        """Discard any frames left on the push queue."""
+        try:
+            while True:
+                self._frameq.get(False)
+        except q.Empty:
+            pass
+
     def next(self, block=True):
         """
         Returns the next (queued or pulled) dataset from the eyetracker.
@@ -598,26 +1008,30 @@ class EyeTribe():
             p = self._tell_tracker(EyeTribe.etm_cpend)
 
             if 'values' in p:
-                self._calibres.result = p['values']['calibresult']['result']
-                self._calibres.deg = p['values']['calibresult']['deg']
-                self._calibres.degl = p['values']['calibresult']['degl']
-                self._calibres.degr = p['values']['calibresult']['degr']
+                # build the result aside and swap it in, as it may be read from another thread meanwhile
+                cr = EyeTribe.Calibration()
+                cr.result = p['values']['calibresult']['result']
+                cr.deg = p['values']['calibresult']['deg']
+                cr.degl = p['values']['calibresult']['degl']
+                cr.degr = p['values']['calibresult']['degr']
 
                 cps = p['values']['calibresult']['calibpoints']
-                self._calibres.points = [ EyeTribe.CalibrationPoint() for i in range(len(cps)) ]
+                cr.pointcount = len(cps)
+                cr.points = [ EyeTribe.CalibrationPoint() for i in range(len(cps)) ]
                 for i in range(len(cps)):
-                    self._calibres.points[i].state = cps[i]['state']
-                    self._calibres.points[i].cp = EyeTribe.Coord(cps[i]['cp']['x'], cps[i]['cp']['y'])
-                    self._calibres.points[i].mecp = EyeTribe.Coord(cps[i]['cp']['x'], cps[i]['cp']['y'])
-                    self._calibres.points[i].ad = cps[i]['acd']['ad']
-                    self._calibres.points[i].adl = cps[i]['acd']['adl']
-                    self._calibres.points[i].adr = cps[i]['acd']['adr']
-                    self._calibres.points[i].mep = cps[i]['mepix']['mep']
-                    self._calibres.points[i].mepl = cps[i]['mepix']['mepl']
-                    self._calibres.points[i].mepr = cps[i]['mepix']['mepr']
-                    self._calibres.points[i].asd = cps[i]['asdp']['asd']
-                    self._calibres.points[i].asdl = cps[i]['asdp']['asdl']
-                    self._calibres.points[i].asdr = cps[i]['asdp']['asdr']
+                    cr.points[i].state = cps[i]['state']
+                    cr.points[i].cp = EyeTribe.Coord(cps[i]['cp']['x'], cps[i]['cp']['y'])
+                    cr.points[i].mecp = EyeTribe.Coord(cps[i]['cp']['x'], cps[i]['cp']['y'])
+                    cr.points[i].ad = cps[i]['acd']['ad']
+                    cr.points[i].adl = cps[i]['acd']['adl']
+                    cr.points[i].adr = cps[i]['acd']['adr']
+                    cr.points[i].mep = cps[i]['mepix']['mep']
+                    cr.points[i].mepl = cps[i]['mepix']['mepl']
+                    cr.points[i].mepr = cps[i]['mepix']['mepr']
+                    cr.points[i].asd = cps[i]['asdp']['asd']
+                    cr.points[i].asdl = cps[i]['asdp']['asdl']
+                    cr.points[i].asdr = cps[i]['asdp']['asdr']
+                self._calibres = cr
 
                 '''
                 if self._calibres.result:
@@ -627,6 +1041,28 @@ class EyeTribe():
                     print("WARNING: Tracker failed to calibrate")
                 '''
 
+    def calibration_start_async(self, pointcount=9, callback=None):
+        """As calibration_start, but returns an EyeTribe.Request immediately instead of waiting for the tracker."""
+        return self._async(callback, self.calibration_start, pointcount)
+
+    def calibration_point_start_async(self, x, y, callback=None):
+        """As calibration_point_start, but returns an EyeTribe.Request immediately instead of waiting for the tracker."""
+        return self._async(callback, self.calibration_point_start, x, y)
+
+    def calibration_point_end_async(self, callback=None):
+        """
+        As calibration_point_end, but returns an EyeTribe.Request immediately instead of waiting for the tracker.
+
+        The calibration result (if any) is parsed on the worker thread, and the result of the request
+        is the latest_calibration_result() once done.
+        """
+
+        def _end():
+            self.calibration_point_end()
+            return self._calibres
+
+        return self._async(callback, _end)
+
     def calibration_abort(self):
             self._tell_tracker(EyeTribe.etm_calib_abort)
 
@@ -636,6 +1072,24 @@ class EyeTribe():
     def latest_calibration_result(self):
         return self._calibres
 
+    def mark(self, label):
+        """
+        Record a marker (e.g. a stimulus onset or keypress) with the current wall-time epoch.
+
+        The time base is the same as for Frame.etime and Frame.timestamp, so markers can be
+        aligned with the gaze data afterwards (see petepoch). Returns the EyeTribe.Marker.
+        """
+        m = EyeTribe.Marker(label, time.time())
+        self._markers.append(m)
+        return m
+
+    def markers(self, clear=False):
+        """Return the list of markers recorded so far, optionally clearing them."""
+        m = self._markers
+        if clear:
+            self._markers = []
+        return list(m)
+
 if __name__ == "__main__":
     """
     Example usage -- this code is only executed if file is run directly
@@ -34,6 +34,24 @@ from psychopy import visual, core, event, monitors, tools
 import pyglet
 from peyetribe import EyeTribe
 import math
+import numpy as np
+
+def flip_for(win, tracker, seconds, frames=None):
+    '''
+    Keep flipping 'win' for the given time, rather than stalling it with core.wait
+
+    If a list is given as 'frames', the frames pushed by 'tracker' meanwhile are drained from its
+    queue into the list (the tracker must be in pushmode for this)
+    '''
+    clock = core.Clock()
+    while clock.getTime() < seconds:
+        win.flip()
+        if frames is not None:
+            ef = tracker.next(False)
+            while ef is not None:
+                frames.append(ef)
+                ef = tracker.next(False)
+
 
 def calibrate_tracker(win, tracker):
     '''
@@ -82,6 +100,9 @@ def calibrate_tracker(win, tracker):
 
     periradius = 30
     pwincolor = win.color
+    # the gaze is shown using pushmode; leave the tracker in the mode we got it in
+    pushing = tracker._ispushmode
+
     recal = True
     while recal:
         win.color = '#444'
@@ -99,7 +120,9 @@ def calibrate_tracker(win, tracker):
 
         win.flip()
 
-        tracker.calibration_start(9)
+        # all tracker requests below are run in order on the tracker's worker thread, so the
+        # animation keeps its frame timing while waiting for the tracker round-trips
+        requests = [tracker.calibration_start_async(9)]
         points = []
         prx = None
         pry = None
@@ -140,14 +163,13 @@ def calibrate_tracker(win, tracker):
             cperi.lineColor = "#f88"
             win.flip()
 
-            tracker.calibration_point_start(px, py)
-            core.wait(1.0)
-            tracker.calibration_point_end()
+            requests.append(tracker.calibration_point_start_async(px, py))
+            flip_for(win, tracker, 1.0)
+            requests.append(tracker.calibration_point_end_async())
 
             ccent.fillColor = "#bfb"
             cperi.lineColor = "#bfb"
-            win.flip()
-            core.wait(0.5)
+            flip_for(win, tracker, 0.5)
 
             points.append((x, y, px, py))
 
@@ -159,6 +181,10 @@ def calibrate_tracker(win, tracker):
         win.color = pwincolor 
         win.flip()
 
+        # wait for the last point to be processed, and raise any errors from the requests (or if they hang)
+        for r in requests:
+            r.result(10.0)
+
         cres = tracker.latest_calibration_result()
         if not cres.result:
             abort = 'escape' == display_text("Your calibration failed. Press SPACE to redo.")
@@ -197,10 +223,17 @@ def calibrate_tracker(win, tracker):
 
             win.flip()
 
+            # use pushed frames, keeping the latest, so we never wait for the tracker between flips
+            tracker.pushmode()
+            ef = None
             cont = True
             while cont:
-                ef = tracker.next()
-                eye.pos = (ef.avg.x - round(maxx/2), -(ef.avg.y - maxy + round(maxy)/2))
+                nf = tracker.next(False)
+                while nf is not None:
+                    ef = nf
+                    nf = tracker.next(False)
+                if ef is not None:
+                    eye.pos = (ef.avg.x - round(maxx/2), -(ef.avg.y - maxy + round(maxy)/2))
                 eye.draw()
                 win.flip()
 
@@ -209,6 +242,9 @@ def calibrate_tracker(win, tracker):
                     cont = False
                     recal = keys[0] == 'r'
 
+            if not pushing:
+                tracker.pullmode()
+
             for cpc in cpcs:
                 cpc.autoDraw = False
             eye.autoDraw = False
@@ -218,3 +254,142 @@ def calibrate_tracker(win, tracker):
                 tracker.calibration_clear()
 
     return True
+
+
+def validation_metrics(targets, frames, screenres, cmperpix, distance, maxdeg=1.0, maxloss=0.2):
+    '''
+    Compute accuracy, precision and data loss from the frames recorded while fixating each target
+
+    'targets' is a list of (x, y) target positions in tracker screen pixels, and 'frames' a list with
+    the list of frames recorded for each target. 'screenres' is the (width, height) of the screen in
+    pixels, 'cmperpix' the size of a pixel and 'distance' the viewing distance (both in cm).
+
+    Accuracy is the angle between the target and the mean gaze position, precision the RMS of the
+    angles between successive samples (RMS-S2S), and loss the share of frames without valid gaze;
+    all angles are in degrees, per point and per eye (combined, left, right). The result is True
+    if the mean accuracy is at most 'maxdeg' and the loss at most 'maxloss'.
+
+    Returns an EyeTribe.Validation
+    '''
+
+    def to_cm(x, y):
+        '''Screen pixel coordinates to 3D vectors (in cm) from the eye, with the screen center straight ahead'''
+        return np.stack(((x - screenres[0]/2.0) * cmperpix, (y - screenres[1]/2.0) * cmperpix,
+                         np.full(np.shape(x), float(distance))), axis=-1)
+
+    def angle(a, b):
+        return np.degrees(np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), np.sum(a * b, axis=-1)))
+
+    # flatten all frames to columns, with the index of the target they belong to
+    npts = len(targets)
+    idx = np.concatenate([np.full(len(f), i, dtype=int) for i, f in enumerate(frames)] + [np.zeros(0, dtype=int)])
+    flat = [f for fs in frames for f in fs]
+    gazeok = np.array([f.hasgaze for f in flat], dtype=bool)
+    total = np.bincount(idx, minlength=npts).astype(float)
+    tp = to_cm(np.array([t[0] for t in targets], dtype=float), np.array([t[1] for t in targets], dtype=float))
+
+    metrics = {}
+    for eye, coord in (('', lambda f: f.avg), ('l', lambda f: f.lefteye.avg), ('r', lambda f: f.righteye.avg)):
+        x = np.array([coord(f).x for f in flat], dtype=float)
+        y = np.array([coord(f).y for f in flat], dtype=float)
+        valid = gazeok & ((x != 0) | (y != 0))
+        n = np.bincount(idx[valid], minlength=npts).astype(float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mx = np.bincount(idx[valid], weights=x[valid], minlength=npts) / n
+            my = np.bincount(idx[valid], weights=y[valid], minlength=npts) / n
+            ad = angle(to_cm(mx, my), tp)
+
+            # successive valid samples within the same target
+            g = to_cm(x, y)
+            pair = valid[1:] & valid[:-1] & (idx[1:] == idx[:-1])
+            s2s = angle(g[1:][pair], g[:-1][pair])
+            pidx = idx[1:][pair]
+            rms = np.sqrt(np.bincount(pidx, weights=s2s**2, minlength=npts) / np.bincount(pidx, minlength=npts))
+
+            loss = 1 - n / total
+
+        metrics[eye] = (ad, rms, loss)
+
+    def mean(a):
+        a = a[np.isfinite(a)]
+        return float(a.mean()) if len(a) else None
+
+    vr = EyeTribe.Validation()
+    vr.pointcount = npts
+    vr.points = [EyeTribe.ValidationPoint() for i in range(npts)]
+    for i in range(npts):
+        vr.points[i].tp = EyeTribe.Coord(targets[i][0], targets[i][1])
+        vr.points[i].samples = int(total[i])
+        for eye in ('', 'l', 'r'):
+            ad, rms, loss = metrics[eye]
+            setattr(vr.points[i], 'ad' + eye, float(ad[i]))
+            setattr(vr.points[i], 'rms' + eye, float(rms[i]))
+            setattr(vr.points[i], 'loss' + eye, float(loss[i]))
+    for eye in ('', 'l', 'r'):
+        ad, rms, loss = metrics[eye]
+        setattr(vr, 'deg' + eye, mean(ad))
+        setattr(vr, 'rms' + eye, mean(rms))
+        setattr(vr, 'loss' + eye, float(1 - (1 - np.nan_to_num(loss)).dot(total) / total.sum()) if total.sum() else None)
+
+    vr.result = vr.deg is not None and vr.deg <= maxdeg and vr.loss <= maxloss
+
+    return vr
+
+
+def validate_tracker(win, tracker, points=5, settle=0.5, duration=1.0, maxdeg=1.0, maxloss=0.2):
+    '''
+    Run a validation routine on the calibrated eye tracker 'tracker' in specified 'win' (must be fullscreen)
+
+    Shows 'points' (5 or 9) targets in turn, and records the pushed frames during 'duration' seconds
+    of each, after allowing 'settle' seconds to move the gaze there. The tracker is left in pushmode,
+    and frames must be queued (i.e. not consumed by a pushmode callback) for this to work.
+
+    The screen size and viewing distance are taken from the monitor of 'win'.
+
+    Returns an EyeTribe.Validation with the metrics (see validation_metrics); its result is True if
+    the validation is acceptable
+    '''
+
+    maxx, maxy = tracker.get_screen_res()
+    cmperpix = win.monitor.getWidth() / float(win.monitor.getSizePix()[0])
+    distance = win.monitor.getDistance()
+
+    if points == 9:
+        grid = [(i % 3, i // 3) for i in range(9)]
+    else:
+        grid = [(1, 1), (0, 0), (2, 0), (0, 2), (2, 2)]
+
+    tracker.pushmode()
+
+    ccent = visual.Circle(win, 4)
+    cperi = visual.Circle(win, 15)
+    ccent.lineColor = None
+    ccent.fillColor = "#000"
+    ccent.units = 'pix'
+    cperi.lineColor = "#000"
+    cperi.fillColor = None
+    cperi.units = 'pix'
+    ccent.autoDraw = True
+    cperi.autoDraw = True
+
+    targets = []
+    frames = []
+    for gx, gy in grid:
+        x = (gx-1.0)*0.8 * maxx/2.0
+        y = -(gy-1.0)*0.8 * maxy/2.0
+        ccent.pos = (x, y)
+        cperi.pos = (x, y)
+
+        flip_for(win, tracker, settle, [])
+        fs = []
+        flip_for(win, tracker, duration, fs)
+
+        targets.append((x + round(maxx/2), maxy - (y + maxy - round(maxy/2))))
+        frames.append(fs)
+
+    ccent.autoDraw = False
+    cperi.autoDraw = False
+    win.flip()
+
+    return validation_metrics(targets, frames, (maxx, maxy), cmperpix, distance, maxdeg, maxloss)